@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Shared configuration store for the LOTRO utilities.
+
+- One JSON file for every tool, split into sections ("music", "plugins", "multibox")
+- Loaded once per process; tools edit the section dicts in memory
+- flush() re-reads the file and applies only the keys this process set,
+  so edits made meanwhile (by hand or another tool) survive; it writes
+  once, only if something changed, via an atomic temp-file rename
+- Settings from the old per-tool files are migrated on first load
+"""
+
+import os
+import json
+import atexit
+import platform
+import tempfile
+from pathlib import Path
+
+_config = None
+# (section, key) pairs assigned or deleted since the last flush
+_dirty = set()
+# (section, key) defaults filled in; written only if the file still lacks them
+_defaults = set()
+# set when the config file exists but can't be parsed; we never overwrite it
+_unreadable = False
+
+
+class Section(dict):
+    """A config section that records which keys were assigned, for flush()."""
+
+    def __init__(self, name, data=()):
+        super().__init__(data)
+        self.name = name
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        _dirty.add((self.name, key))
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        _dirty.add((self.name, key))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            _dirty.add((self.name, key))
+        return super().pop(key, *default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+
+def get_config_path():
+    """Return OS-specific path for the shared config file."""
+    home = Path.home()
+    if platform.system().lower() == "windows":
+        config_dir = Path(os.getenv("APPDATA", home / "AppData/Roaming"))
+    else:
+        config_dir = Path(os.getenv("XDG_CONFIG_HOME", home / ".config"))
+    return config_dir / "lotro_linux_utils.json"
+
+
+def legacy_config_paths():
+    """Per-tool config files written by older versions, keyed by section."""
+    home = Path.home()
+    if platform.system().lower() == "windows":
+        return {
+            "music": home / "AppData" / "Local" / "pysongbooker.json",
+            "plugins": Path(os.getenv("APPDATA", home / "AppData/Roaming")) / "lotro_plugin_installer.json",
+        }
+    return {
+        "music": home / ".config" / "pysongbooker.json",
+        "plugins": home / ".config" / "lotro_plugin_installer.json",
+    }
+
+
+def read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[WARN] Failed to read config file {path}: {e}")
+        return None
+
+
+def load_config():
+    """Return the in-memory config, reading it from disk on first use."""
+    global _config, _unreadable
+    if _config is not None:
+        return _config
+
+    path = get_config_path()
+    if path.exists():
+        data = read_json(path)
+        if not isinstance(data, dict):
+            print(f"[WARN] {path} is not valid config; fix or remove it. Settings changed this run will not be saved.")
+            _unreadable = True
+            _config = {}
+            return _config
+        _config = {name: Section(name, values) if isinstance(values, dict) else values
+                   for name, values in data.items()}
+        return _config
+
+    _config = {}
+    for name, legacy in legacy_config_paths().items():
+        if legacy.exists():
+            old = read_json(legacy)
+            if old:
+                print(f"[INFO] Migrating settings from {legacy}")
+                # assigned through the Section so the migrated keys get written
+                _config[name] = Section(name)
+                _config[name].update(old)
+    return _config
+
+
+def section(name, defaults=None):
+    """Return the live dict for one tool's settings, filling in any missing defaults."""
+    config = load_config()
+    if not isinstance(config.get(name), Section):
+        config[name] = Section(name)
+    sec = config[name]
+    for key, value in (defaults or {}).items():
+        if key not in sec:
+            dict.__setitem__(sec, key, value)
+            _defaults.add((name, key))
+    return sec
+
+
+def mark_flushed(merged):
+    """Forget pending changes and pick up edits made by others since load."""
+    _dirty.clear()
+    _defaults.clear()
+    for name, values in merged.items():
+        if isinstance(values, dict):
+            live = _config.setdefault(name, Section(name))
+            dict.update(live, values)
+
+
+def flush():
+    """
+    Merge this process's changes into the file on disk and write it atomically.
+
+    Keys nobody here assigned keep whatever the file has now. No-op if
+    nothing changed.
+    """
+    if _config is None or _unreadable or not (_dirty or _defaults):
+        return
+
+    path = get_config_path()
+    disk = {}
+    if path.exists():
+        disk = read_json(path)
+        if not isinstance(disk, dict):
+            print(f"[WARN] {path} is not valid config; not overwriting it.")
+            return
+
+    merged = json.loads(json.dumps(disk))
+    for name, key in _dirty:
+        sec = _config.get(name, {})
+        if key in sec:
+            merged.setdefault(name, {})[key] = sec[key]
+        elif isinstance(merged.get(name), dict):
+            merged[name].pop(key, None)
+    for name, key in _defaults:
+        if key not in merged.get(name, {}):
+            merged.setdefault(name, {})[key] = _config[name][key]
+
+    text = json.dumps(merged, indent=2)
+    if text == json.dumps(disk, indent=2) and path.exists():
+        mark_flushed(merged)
+        return
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        mark_flushed(merged)
+        print(f"[INFO] Saved configuration to {path}")
+    except Exception as e:
+        print(f"[WARN] Could not save config file: {e}")
+
+
+atexit.register(flush)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Filesystem helpers shared by the LOTRO utilities.
+"""
+
+import os
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)); used for reflinks on btrfs/xfs
+FICLONE = 0x40049409
+
+
+def try_reflink(src, dst):
+    """Clone src into dst with a copy-on-write reflink. Returns True on success."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Login input backends for the multibox launcher.
+
+- xdotool: finds the launcher window by PID (or title), focuses it and types each field in one call
+- ydotool: uinput typing for Wayland sessions; types into whatever window has focus
+- pyautogui: original per-character fallback; also needs the launcher focused by hand
+"""
+
+import os
+import re
+import time
+import shutil
+import subprocess
+
+BACKENDS = ("xdotool", "ydotool", "pyautogui")
+
+# Linux input event keycodes used by ydotool
+KEY_TAB = "15"
+KEY_ENTER = "28"
+
+# seconds before giving up on a single xdotool/ydotool call
+FOCUS_TIMEOUT = 5
+INPUT_TIMEOUT = 10
+
+
+def pick_backend(preferred="auto"):
+    """Resolve "auto" to the best backend available in this session."""
+    if preferred != "auto":
+        if preferred not in BACKENDS:
+            raise ValueError(f"Unknown input backend '{preferred}', expected one of {BACKENDS}")
+        if preferred != "pyautogui" and not shutil.which(preferred):
+            print(f"[WARN] {preferred} not found on PATH, falling back to pyautogui")
+            return "pyautogui"
+        return preferred
+
+    if os.environ.get("DISPLAY") and shutil.which("xdotool"):
+        return "xdotool"
+    if shutil.which("ydotool"):
+        return "ydotool"
+    return "pyautogui"
+
+
+def can_target_windows(backend):
+    return backend == "xdotool"
+
+
+def descendant_pids(pid):
+    """Return pid followed by all of its descendants, read from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm can contain spaces and parens; ppid is the 2nd field after the last ')'
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = []
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        stack.extend(children.get(p, []))
+    return pids
+
+
+def xdotool_search(*args):
+    try:
+        result = subprocess.run(["xdotool", "search", "--onlyvisible", *args],
+                                capture_output=True, text=True, timeout=FOCUS_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return []
+    return result.stdout.split()
+
+
+def window_name(wid):
+    try:
+        result = subprocess.run(["xdotool", "getwindowname", wid],
+                                capture_output=True, text=True, timeout=FOCUS_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return None
+    return result.stdout.rstrip("\n") if result.returncode == 0 else None
+
+
+def title_matches(title):
+    """Return visible windows whose title is exactly `title`."""
+    if not title:
+        return []
+    # --name is an unanchored regex, so anchor it and confirm the exact name
+    pattern = re.sub(r"([.^$*+?()\[\]{}|\\])", r"\\\1", title)
+    candidates = xdotool_search("--name", f"^{pattern}$")
+    return [wid for wid in candidates if window_name(wid) == title]
+
+
+def find_window(pid, title, exclude=(), timeout=30.0, title_grace=15.0, poll=0.25):
+    """
+    Wait for the launcher window started by pid and return its X window id.
+
+    Windows owned by the process tree win. Only after title_grace seconds
+    without one is the newest window titled exactly `title` used; callers
+    must pass every such window that existed before launch (and ids claimed
+    by earlier clients) in `exclude`, so an unrelated window is never chosen.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    while time.monotonic() < deadline:
+        for p in descendant_pids(pid):
+            for wid in xdotool_search("--pid", str(p)):
+                if wid not in exclude:
+                    return wid
+
+        if time.monotonic() - started >= title_grace:
+            for wid in reversed(title_matches(title)):
+                if wid not in exclude:
+                    return wid
+
+        time.sleep(poll)
+    return None
+
+
+def focus_window(wid):
+    """Activate the window; raises if xdotool fails or the WM never confirms focus."""
+    subprocess.run(["xdotool", "windowactivate", "--sync", wid],
+                   capture_output=True, check=True, timeout=FOCUS_TIMEOUT)
+
+
+def send_field(backend, text, submit_key, fallback_delay=0.02):
+    """
+    Type one field and press Tab/Enter after it.
+
+    Text is passed on stdin rather than argv so passwords never show up in
+    the process list.
+    """
+    if backend == "xdotool":
+        subprocess.run(["xdotool", "type", "--clearmodifiers", "--delay", "0", "--file", "-"],
+                       input=text, text=True, check=True, timeout=INPUT_TIMEOUT)
+        key = "Tab" if submit_key == "tab" else "Return"
+        subprocess.run(["xdotool", "key", "--clearmodifiers", key], check=True, timeout=INPUT_TIMEOUT)
+    elif backend == "ydotool":
+        subprocess.run(["ydotool", "type", "--key-delay", "0", "--file", "-"],
+                       input=text, text=True, check=True, timeout=INPUT_TIMEOUT)
+        code = KEY_TAB if submit_key == "tab" else KEY_ENTER
+        subprocess.run(["ydotool", "key", f"{code}:1", f"{code}:0"], check=True, timeout=INPUT_TIMEOUT)
+    else:
+        import pyautogui
+        pyautogui.write(text, interval=fallback_delay)
+        pyautogui.press(submit_key)
+
+
+def type_login(backend, user, password, wid=None, field_delay=0.1, fallback_delay=0.02):
+    """
+    Focus the launcher (when a window id is known) and submit username and password.
+
+    Any failure raises; callers should give up on the client rather than
+    retry, since a retry can't know which field already went through.
+    """
+    if wid is not None:
+        focus_window(wid)
+    send_field(backend, user, "tab", fallback_delay)
+    time.sleep(field_delay)
+    send_field(backend, password, "enter", fallback_delay)
@@ -5,48 +5,85 @@ LOTRO Multibox Launcher (Python + GE-Proton)
 - Isolated prefixes (per-client)
 - Auto-fills username
 - Places windows in 2×3 grid on a 4K display (not working)
+
+Settings live in the "multibox" section of the shared config file
+(see lotro_config.get_config_path()); defaults are written there on first run.
 """
 
 import os
+import sys
 import time
 import subprocess
 from pathlib import Path
-import pyautogui
 import keyring
+import lotro_config
+import lotro_input
 
 HOME = Path.home()
 
 # ---------------------- USER SETTINGS ----------------------
 
-PROTON = HOME / ".local/share/Steam/compatibilitytools.d/GE-Proton10-15/proton"
-BASE_COMPAT = HOME / ".local/share/Steam/steamapps/compatdata/4187400038/pfx"
-LAUNCHER_EXE = (
-    BASE_COMPAT
-    / "drive_c/Program Files (x86)/StandingStoneGames/The Lord of the Rings Online/LotroLauncher.exe"
-)
-
-#USERFILE = HOME / "lotro-usernames.txt"
-USERFILE = Path("lotro-usernames.sample")
-
-CLIENT_PREFIX_ROOT = HOME / "lotro_prefixes"
-CLIENT_DOCS_ROOT = HOME / "lotro_docs"
-NUM_CLIENTS = 6
-DELAY_BETWEEN_LAUNCHES = 10
-
-USERNAME_DELAY = 0.02
-
-# Grid size (4K, 2×3 layout)
-TILE_W = 1920
-TILE_H = 720
-
-POSITIONS = [
-    (0, 0),
-    (1920, 0),
-    (0, 720),
-    (1920, 720),
-    (0, 1440),
-    (1920, 1440),
-]
+DEFAULTS = {
+    "proton": "~/.local/share/Steam/compatibilitytools.d/GE-Proton10-15/proton",
+    "base_compat": "~/.local/share/Steam/steamapps/compatdata/4187400038/pfx",
+    "launcher_exe": "drive_c/Program Files (x86)/StandingStoneGames/The Lord of the Rings Online/LotroLauncher.exe",
+    "userfile": "lotro-usernames.sample",
+    "client_prefix_root": "~/lotro_prefixes",
+    "client_docs_root": "~/lotro_docs",
+    "num_clients": 6,
+    "delay_between_launches": 10,
+    "username_delay": 0.02,
+    # auto, xdotool, ydotool or pyautogui
+    "input_backend": "auto",
+    "launcher_window_title": "The Lord of the Rings Online",
+    "window_timeout": 60,
+    # seconds to wait for a window owned by the launcher process before matching by title
+    "window_title_grace": 15,
+    "login_settle_delay": 1.0,
+    "field_delay": 0.1,
+    # Grid size (4K, 2×3 layout)
+    "tile_w": 1920,
+    "tile_h": 720,
+    "positions": [
+        [0, 0],
+        [1920, 0],
+        [0, 720],
+        [1920, 720],
+        [0, 1440],
+        [1920, 1440],
+    ],
+}
+
+SETTINGS = lotro_config.section("multibox", DEFAULTS)
+
+def setting_path(key):
+    return Path(os.path.expanduser(SETTINGS[key]))
+
+PROTON = setting_path("proton")
+BASE_COMPAT = setting_path("base_compat")
+# relative launcher paths are resolved inside the base prefix
+LAUNCHER_EXE = BASE_COMPAT / setting_path("launcher_exe")
+
+USERFILE = setting_path("userfile")
+
+CLIENT_PREFIX_ROOT = setting_path("client_prefix_root")
+CLIENT_DOCS_ROOT = setting_path("client_docs_root")
+NUM_CLIENTS = int(SETTINGS["num_clients"])
+DELAY_BETWEEN_LAUNCHES = float(SETTINGS["delay_between_launches"])
+
+USERNAME_DELAY = float(SETTINGS["username_delay"])
+
+INPUT_BACKEND = SETTINGS["input_backend"]
+LAUNCHER_WINDOW_TITLE = SETTINGS["launcher_window_title"]
+WINDOW_TIMEOUT = float(SETTINGS["window_timeout"])
+WINDOW_TITLE_GRACE = float(SETTINGS["window_title_grace"])
+LOGIN_SETTLE_DELAY = float(SETTINGS["login_settle_delay"])
+FIELD_DELAY = float(SETTINGS["field_delay"])
+
+TILE_W = int(SETTINGS["tile_w"])
+TILE_H = int(SETTINGS["tile_h"])
+
+POSITIONS = [tuple(pos) for pos in SETTINGS["positions"]]
 
 
 # ----------------------- HELPERS ---------------------------
@@ -131,7 +168,7 @@ def launch_client(prefix: Path, docs: Path, title: str):
         str(LAUNCHER_EXE)
     ]
 
-    subprocess.Popen(cmd, env=env)
+    return subprocess.Popen(cmd, env=env)
 
 # -------------------------- MAIN ---------------------------
 
@@ -139,32 +176,66 @@ def run():
     usernames = read_usernames()
     credentials = load_credentials(usernames)
     prefixes, docs_dirs = ensure_client_dirs()
+    backend = lotro_input.pick_backend(INPUT_BACKEND)
+    targeted = lotro_input.can_target_windows(backend)
 
     print(f"Launching {NUM_CLIENTS} LOTRO clients under GE-Proton (Wayland)...")
+    print(f"Login input backend: {backend}")
+
+    claimed = set()
+    timings = []
+    skipped = []
 
     for i in range(NUM_CLIENTS):
         prefix = prefixes[i]
         docs = docs_dirs[i]
         title = f"Band Client {i+1}"
-        user = usernames[i]
-        password = credentials[i]
+        user, password = credentials[i]
 
         print(f"[{i+1}/{NUM_CLIENTS}] Launching prefix {prefix} with username '{user}'")
-        launch_client(prefix, docs, title)
-        time.sleep(DELAY_BETWEEN_LAUNCHES)  # wait a bit for launcher to open
-
-        print("  Typing username (click into launcher window first!)")
-        time.sleep(1)
-        pyautogui.write(user, interval=USERNAME_DELAY)
-        pyautogui.press("tab")  # focus password field
-        time.sleep(1)
-
-        # this will work, just need to figure out k/v store
-        pyautogui.write(password, interval=USERNAME_DELAY)
-        time.sleep(1)
-        pyautogui.press("enter")
-
-    print("\nAll launch attempts done. Enter passwords and click Play for each client.")
+        # launcher-titled windows from before this launch (browser tabs, old sessions) are never targets
+        preexisting = set(lotro_input.title_matches(LAUNCHER_WINDOW_TITLE)) if targeted else set()
+        started = time.monotonic()
+        proc = launch_client(prefix, docs, title)
+
+        wid = None
+        if targeted:
+            wid = lotro_input.find_window(proc.pid, LAUNCHER_WINDOW_TITLE,
+                                          exclude=claimed | preexisting, timeout=WINDOW_TIMEOUT,
+                                          title_grace=WINDOW_TITLE_GRACE)
+            if wid is None:
+                # never type credentials blind; they could land in a terminal or chat
+                print(f"  [WARN] Launcher window not found after {WINDOW_TIMEOUT:.0f}s, skipping login for '{user}'")
+                skipped.append(user)
+                continue
+            claimed.add(wid)
+        else:
+            time.sleep(DELAY_BETWEEN_LAUNCHES)  # wait a bit for launcher to open
+            print("  Typing login (click into launcher window first!)")
+        window_ready = time.monotonic()
+
+        time.sleep(LOGIN_SETTLE_DELAY)  # let the login fields finish drawing
+        try:
+            lotro_input.type_login(backend, user, password, wid=wid,
+                                   field_delay=FIELD_DELAY, fallback_delay=USERNAME_DELAY)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            print(f"  [WARN] {backend} input failed ({e}), skipping login for '{user}'")
+            skipped.append(user)
+            continue
+        done = time.monotonic()
+
+        timings.append((user, window_ready - started, done - window_ready, done - started))
+        print(f"  Login sent in {done - started:.2f}s "
+              f"(window {window_ready - started:.2f}s, input {done - window_ready:.2f}s)")
+
+    print("\nLogin latency per client:")
+    for user, window, typing, total in timings:
+        print(f"  {user:<16} window {window:6.2f}s  input {typing:6.2f}s  total {total:6.2f}s")
+    print(f"  {'(all)':<16} total {sum(t[3] for t in timings):6.2f}s")
+    if skipped:
+        print(f"\nLogin skipped, log in manually: {', '.join(skipped)}")
+
+    print("\nAll launch attempts done. Click Play for each client.")
     print("Window placement must be handled via KDE Window Rules or manually.")
 
 if __name__ == "__main__":
@@ -1,6 +1,7 @@
 from plugin_installer import run as install_plugins
 from add_to_keyring import run as add_credentials
 from update_music_db import run as update_music
+from update_music_db import run_all_accounts as update_music_all
 from lotro_multibox import run as start_multibox
 
 def menu():
@@ -10,7 +11,8 @@ def menu():
         print("2) Install plugins")
         print("3) Add credentials to keyring")
         print("4) Refresh music database")
-        print("5) Exit")
+        print("5) Refresh music database (all accounts)")
+        print("6) Exit")
 
         choice = input("Select an option: ")
 
@@ -23,6 +25,8 @@ def menu():
         elif choice == "4":
             update_music()
         elif choice == "5":
+            update_music_all()
+        elif choice == "6":
             break
         else:
             print("Invalid selection — try again.")
@@ -2,44 +2,383 @@
 import os
 import sys
 import json
+import time
 import shutil
+import hashlib
+import argparse
 import zipfile
 import platform
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from pathlib import Path
+import lotro_config
+from lotro_fs import try_reflink
 
-def get_config_path():
-    """Return OS-specific config file path."""
+def get_store_path():
+    """Return OS-specific root of the local plugin archive store."""
     home = Path.home()
     if platform.system().lower() == "windows":
-        config_dir = Path(os.getenv("APPDATA", home / "AppData/Roaming"))
+        data_dir = Path(os.getenv("LOCALAPPDATA", home / "AppData/Local"))
     else:
-        config_dir = home / ".config"
-    #config_dir = config_dir / "pysongbooker"
-    #config_dir.mkdir(parents=True, exist_ok=True)
-    return config_dir / "lotro_plugin_installer.json"
+        data_dir = Path(os.getenv("XDG_DATA_HOME", home / ".local/share"))
+    return data_dir / "lotro_plugin_store"
 
 
-def load_config():
-    path = get_config_path()
+def load_store_index():
+    """Load the store index: archives by hash, and what each Plugins dir runs."""
+    path = get_store_path() / "index.json"
     if path.exists():
         try:
             with open(path, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception as e:
-            print(f"[WARN] Could not read config: {e}")
-    return {}
+            print(f"[WARN] Could not read store index: {e}")
+    return {"archives": {}, "dirs": {}}
+
+
+def save_store_index(index):
+    path = get_store_path() / "index.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, path)
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def ensure_tree(digest):
+    """Return the extracted tree for an archive, extracting it once if needed."""
+    store = get_store_path()
+    tree = store / "trees" / digest
+    if tree.exists():
+        return tree
+
+    archive = store / "archives" / f"{digest}.zip"
+    if not archive.exists():
+        raise FileNotFoundError(f"Archive {digest[:12]} is not in the plugin store")
+
+    staging = store / "trees" / f".{digest}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    print(f"[INFO] Extracting {archive.name} into store")
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+        zip_ref.extractall(staging)
+    os.replace(staging, tree)
+    return tree
+
+
+def plugin_units(tree):
+    """
+    Split an extracted archive into plugins, keyed "<Author>/<Plugin>".
+
+    LOTRO plugins live in Plugins/<Author>/, with a <Plugin> directory next
+    to <Plugin>.plugin (and friends), so second-level entries sharing a
+    stem are one plugin. Loose top-level files are their own unit.
+    """
+    units = {}
+    for top in sorted(tree.iterdir()):
+        if not top.is_dir():
+            units.setdefault(top.name, []).append(top.name)
+            continue
+        for child in sorted(top.iterdir()):
+            stem = child.name.split(".")[0]
+            units.setdefault(f"{top.name}/{stem}", []).append(f"{top.name}/{child.name}")
+    return units
+
+
+def add_to_store(zip_path, index):
+    """Copy a plugin zip into the content-addressed store and return its hash."""
+    digest = hash_file(zip_path)
+    archive = get_store_path() / "archives" / f"{digest}.zip"
+    if not archive.exists():
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(zip_path, archive)
+        print(f"[INFO] Stored {Path(zip_path).name} as {digest[:12]}")
+    else:
+        print(f"[INFO] {Path(zip_path).name} already in store as {digest[:12]}")
+
+    tree = ensure_tree(digest)
+    if digest not in index["archives"]:
+        index["archives"][digest] = {
+            "name": Path(zip_path).name,
+            "added": time.time(),
+            "plugins": plugin_units(tree),
+        }
+    return digest
+
+
+def reflink_or_copy(src, dst):
+    """Copy a file out of the store, as a copy-on-write reflink where supported.
+
+    Installed files must never share an inode with the store, or editing a
+    plugin in place would silently change the archived version too.
+    """
+    if try_reflink(src, dst):
+        shutil.copystat(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def remove_path(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+def get_versions_path(target):
+    """
+    Return the per-Plugins-dir area holding inactive versions, by digest.
+
+    It sits next to the Plugins dir so it shares its filesystem (swaps are
+    plain renames) without LOTRO scanning it for .plugin files.
+    """
+    target = Path(target)
+    return target.parent / f".{target.name}.versions"
+
 
+def unit_paths(digest, units, index):
+    """Relative paths an archive installs for the given plugins."""
+    plugins = index["archives"][digest]["plugins"]
+    return [rel for unit in sorted(units) for rel in plugins.get(unit, [])]
 
-def save_config(cfg):
-    path = get_config_path()
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=2)
-        print(f"[INFO] Saved config to {path}")
-    except Exception as e:
-        print(f"[WARN] Could not save config: {e}")
+
+def prune_empty_parents(path, stop):
+    """Remove now-empty author folders left behind after moving a plugin out."""
+    parent = path.parent
+    while parent != stop and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def park(digest, units, target, index):
+    """Move a version's installed plugin files out of the Plugins dir into its versions area."""
+    parked = get_versions_path(target) / digest
+    for rel in unit_paths(digest, units, index):
+        live = target / rel
+        if not (live.exists() or live.is_symlink()):
+            continue
+        dest = parked / rel
+        remove_path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(live, dest)
+        prune_empty_parents(live, target)
+
+
+def unpark(digest, target, index):
+    """Move a version into the Plugins dir, copying from the store only what isn't parked yet."""
+    parked = get_versions_path(target) / digest
+    units = index["archives"][digest]["plugins"]
+    tree = None
+    for rel in unit_paths(digest, units, index):
+        src = parked / rel
+        if not (src.exists() or src.is_symlink()):
+            tree = tree or ensure_tree(digest)
+            src.parent.mkdir(parents=True, exist_ok=True)
+            if (tree / rel).is_dir():
+                shutil.copytree(tree / rel, src, copy_function=reflink_or_copy)
+            else:
+                reflink_or_copy(tree / rel, src)
+
+        live = target / rel
+        if live.exists() or live.is_symlink():
+            print(f"[WARN] Overwriting existing: {live}")
+            remove_path(live)
+        live.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, live)
+        prune_empty_parents(src, parked.parent)
+        print(f"[INFO] Installed: {live}")
+
+
+def claim_plugin(state, units):
+    """
+    Return the entry key for these plugins plus the (digest, units) to park first.
+
+    Entries sharing a plugin are the same plugin: a fully covered entry is
+    merged in, a partially covered one loses those plugins and its current
+    version (it's no longer intact on disk).
+    """
+    plugins = state["plugins"]
+    overlapping = [k for k, e in plugins.items() if units & set(e["units"])]
+    if not overlapping:
+        key = ",".join(sorted(units))
+        plugins[key] = {"current": None, "history": [], "units": []}
+        return key, []
+
+    key = state["last"] if state["last"] in overlapping else overlapping[0]
+    entry = plugins[key]
+    to_park = [(entry["current"], set(entry["units"]))]
+    for other in overlapping:
+        if other == key:
+            continue
+        taken = set(plugins[other]["units"]) & units
+        remaining = [u for u in plugins[other]["units"] if u not in units]
+        to_park.append((plugins[other]["current"], taken if remaining else set(plugins[other]["units"])))
+        if remaining:
+            plugins[other]["units"] = remaining
+            plugins[other]["current"] = None
+        else:
+            history = plugins.pop(other)["history"]
+            entry["history"] = [d for d in history if d not in entry["history"]] + entry["history"]
+            entry["units"] = sorted(set(entry["units"]) | taken)
+    return key, [(d, u) for d, u in to_park if d]
+
+
+def activate(digest, target_dir, index, record=True):
+    """
+    Swap the Plugins dir over to this archive's version of its plugins.
+
+    The version being replaced is parked in the versions area, so switching
+    back later is a rename rather than a re-copy. With record=False
+    (rollback) the version history is left as is and only the current
+    pointer moves.
+    """
+    target = Path(os.path.abspath(target_dir))
+    target.mkdir(parents=True, exist_ok=True)
+
+    units = set(index["archives"][digest]["plugins"])
+    state = index["dirs"].setdefault(str(target), {"plugins": {}, "last": None})
+    key, to_park = claim_plugin(state, units)
+    entry = state["plugins"][key]
+
+    for old_digest, old_units in to_park:
+        if old_digest == digest:
+            # reinstalling the active version: start again from the pristine store copy
+            for rel in unit_paths(old_digest, old_units, index):
+                remove_path(target / rel)
+                remove_path(get_versions_path(target) / old_digest / rel)
+        else:
+            park(old_digest, old_units, target, index)
+    unpark(digest, target, index)
+
+    entry["current"] = digest
+    entry["units"] = sorted(units)
+    if record:
+        if digest in entry["history"]:
+            entry["history"].remove(digest)
+        entry["history"].append(digest)
+    state["last"] = key
+
+
+def install_archive(zip_path, target_dir):
+    index = load_store_index()
+    digest = add_to_store(zip_path, index)
+    activate(digest, target_dir, index)
+    save_store_index(index)
+    return digest
+
+
+def resolve_hash(prefix, index):
+    matches = [d for d in index["archives"] if d.startswith(prefix)]
+    if len(matches) != 1:
+        raise SystemExit(f"[ERROR] '{prefix}' matches {len(matches)} stored archives")
+    return matches[0]
+
+
+def resolve_plugins_dir(target_dir):
+    if not target_dir:
+        target_dir = lotro_config.section("plugins").get("lotro_plugin_dir")
+    if not target_dir:
+        raise SystemExit("[ERROR] No Plugins directory given or saved in config")
+    return os.path.abspath(target_dir)
+
+
+def describe(digest, index):
+    info = index["archives"][digest]
+    added = time.strftime("%Y-%m-%d %H:%M", time.localtime(info["added"]))
+    return f"{digest[:12]}  {added}  {info['name']}"
+
+
+def list_versions():
+    """List each Plugins dir's plugins with their version history, newest last."""
+    index = load_store_index()
+    if not index["archives"]:
+        print("[INFO] Plugin store is empty.")
+        return
+
+    referenced = set()
+    for target, state in index["dirs"].items():
+        print(target)
+        for key, plugin in sorted(state["plugins"].items()):
+            print(f"  {key}")
+            for digest in plugin["history"]:
+                if digest not in index["archives"]:
+                    continue
+                referenced.add(digest)
+                mark = "*" if digest == plugin["current"] else " "
+                print(f"    {mark} {describe(digest, index)}")
+
+    unused = [d for d in index["archives"] if d not in referenced]
+    if unused:
+        print("Not installed anywhere:")
+        for digest in sorted(unused, key=lambda d: index["archives"][d]["added"]):
+            print(f"    {describe(digest, index)}  [{', '.join(index['archives'][digest]['plugins'])}]")
+
+
+def switch_version(hash_prefix, target_dir=None):
+    index = load_store_index()
+    digest = resolve_hash(hash_prefix, index)
+    activate(digest, resolve_plugins_dir(target_dir), index)
+    save_store_index(index)
+
+
+def rollback(target_dir=None):
+    """Reactivate the previously installed version of the last plugin touched."""
+    index = load_store_index()
+    target = resolve_plugins_dir(target_dir)
+    state = index["dirs"].get(target)
+    if not state or not state["last"]:
+        raise SystemExit(f"[ERROR] No recorded installs for {target}")
+
+    entry = state["plugins"][state["last"]]
+    history = entry["history"]
+    position = history.index(entry["current"]) if entry["current"] in history else 0
+    previous = [d for d in history[:position] if d in index["archives"]]
+    if not previous:
+        raise SystemExit(f"[ERROR] No earlier version of {state['last']} to roll back to")
+
+    digest = previous[-1]
+    print(f"[INFO] Rolling back {state['last']} to {digest[:12]}")
+    activate(digest, target, index, record=False)
+    save_store_index(index)
+
+
+def prune_versions(keep=2):
+    """Delete stored versions that are neither active nor among the newest `keep` of each plugin."""
+    index = load_store_index()
+    store = get_store_path()
+    retained = set()
+    for state in index["dirs"].values():
+        for plugin in state["plugins"].values():
+            if plugin["current"]:
+                retained.add(plugin["current"])
+            retained.update(plugin["history"][-keep:] if keep > 0 else [])
+
+    removed = 0
+    for digest in sorted(index["archives"], key=lambda d: index["archives"][d]["added"]):
+        if digest in retained:
+            continue
+        print(f"[INFO] Pruned {describe(digest, index)}  [{', '.join(index['archives'][digest]['plugins'])}]")
+        remove_path(store / "archives" / f"{digest}.zip")
+        remove_path(store / "trees" / digest)
+        for target, state in index["dirs"].items():
+            remove_path(get_versions_path(target) / digest)
+            for plugin in state["plugins"].values():
+                if digest in plugin["history"]:
+                    plugin["history"].remove(digest)
+        del index["archives"][digest]
+        removed += 1
+
+    save_store_index(index)
+    print(f"[INFO] Pruned {removed} archive(s).")
 
 
 def autodetect_lotro_plugins():
@@ -123,7 +462,7 @@ def select_from_list(options, title="Select LOTRO Plugin Directory"):
 
 
 def choose_zip_and_install():
-    cfg = load_config()
+    cfg = lotro_config.section("plugins")
 
     home = Path.home()
     downloads_dir = home / "Downloads"
@@ -142,7 +481,6 @@ def choose_zip_and_install():
         sys.exit(0)
 
     cfg["downloads_dir"] = str(Path(zip_path).parent)
-    save_config(cfg)
 
     autodetected = autodetect_lotro_plugins()
     target_dir = None
@@ -160,39 +498,39 @@ def choose_zip_and_install():
         sys.exit(0)
 
     cfg["lotro_plugin_dir"] = target_dir
-    save_config(cfg)
-
-    print("[DEBUG] creating temp unzip dir")
-    temp_dir = Path.home() / ".lotro_plugin_tmp"
-    if temp_dir.exists():
-        shutil.rmtree(temp_dir)
-    temp_dir.mkdir(parents=True, exist_ok=True)
-
-    print(f"[INFO] Extracting {zip_path} to {temp_dir}")
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        zip_ref.extractall(temp_dir)
-
-    target = Path(target_dir)
-    for item in temp_dir.iterdir():
-        dest = target / item.name
-        if dest.exists():
-            print(f"[WARN] Overwriting existing: {dest}")
-            if dest.is_dir():
-                shutil.rmtree(dest)
-            else:
-                dest.unlink()
-        if item.is_dir():
-            shutil.copytree(item, dest)
-        else:
-            shutil.copy2(item, dest)
-        print(f"[INFO] Installed: {dest}")
+    lotro_config.flush()
 
-    shutil.rmtree(temp_dir)
+    install_archive(zip_path, target_dir)
     messagebox.showinfo("Success", f"Plugin installed successfully to:\n{target_dir}")
 
 def run():
     print("Running plugin installer!")
     choose_zip_and_install()
 
+def cli():
+    parser = argparse.ArgumentParser(description="Install and manage LOTRO plugin versions.")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("install", help="Pick a plugin zip and install it (default)")
+    sub.add_parser("list", help="List stored plugin archives and where they are active")
+    p_switch = sub.add_parser("switch", help="Activate a stored archive by hash prefix")
+    p_switch.add_argument("hash")
+    p_switch.add_argument("plugins_dir", nargs="?")
+    p_rollback = sub.add_parser("rollback", help="Roll back the last installed plugin")
+    p_rollback.add_argument("plugins_dir", nargs="?")
+    p_prune = sub.add_parser("prune", help="Delete old, inactive archives")
+    p_prune.add_argument("--keep", type=int, default=2, help="Versions to keep per plugin (default 2)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        list_versions()
+    elif args.command == "switch":
+        switch_version(args.hash, args.plugins_dir)
+    elif args.command == "rollback":
+        rollback(args.plugins_dir)
+    elif args.command == "prune":
+        prune_versions(args.keep)
+    else:
+        choose_zip_and_install()
+
 if __name__ == "__main__":
-    choose_zip_and_install()
+    cli()
@@ -1,46 +1,12 @@
 #!/usr/bin/env python3
-import os, re, json, time, platform
+import os, re, sys, json, time, errno, shutil, hashlib, platform
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog
-from pathlib import Path
-
-def get_config_path():
-    """Return the platform-appropriate path for the config file."""
-    system = platform.system()
-
-    if system == "Windows":
-        base_dir = Path.home() / "AppData" / "Local"
-    elif system in ("Linux", "Darwin"):
-        base_dir = Path.home() / ".config"
-    else:
-        base_dir = Path(__file__).parent
-
-        base_dir.mkdir(parents=True, exist_ok=True)
-
-    return base_dir / "pysongbooker.json"
-
-CONFIG_FILE = get_config_path()
-
-def load_config():
-    """Load saved directories from config.json if available."""
-    if CONFIG_FILE.exists():
-        try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[WARN] Failed to read config file: {e}")
-    return {}
-
-def save_config(config):
-    """Save directories to config.json."""
-    try:
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2)
-        print(f"[INFO] Saved configuration to {CONFIG_FILE}")
-    except Exception as e:
-        print(f"[WARN] Could not save config file: {e}")
+import lotro_config
+from lotro_fs import try_reflink
 
 def autodetect_lotro_music():
     """Try to auto-detect the LOTRO music directory under Steam."""
@@ -62,6 +28,19 @@ def autodetect_lotro_music():
 
     return possible_paths[0] if possible_paths else None
 
+def multibox_plugin_roots():
+    """Find PluginData dirs inside the multibox client prefixes and docs dirs."""
+    settings = lotro_config.load_config().get("multibox", {})
+    prefix_root = Path(os.path.expanduser(settings.get("client_prefix_root", "~/lotro_prefixes")))
+    docs_root = Path(os.path.expanduser(settings.get("client_docs_root", "~/lotro_docs")))
+
+    roots = []
+    if prefix_root.is_dir():
+        roots += prefix_root.glob("*/pfx/drive_c/users/*/Documents/The Lord of the Rings Online/PluginData")
+    if docs_root.is_dir():
+        roots += docs_root.glob("*/The Lord of the Rings Online/PluginData")
+    return sorted(r for r in roots if r.is_dir())
+
 def autodetect_lotro_plugin_dirs():
     """Detect all LOTRO PluginData/<account>/AllServers directories."""
     candidates = []
@@ -86,6 +65,8 @@ def autodetect_lotro_plugin_dirs():
         else:
             plugin_roots.append(base)
 
+    plugin_roots += multibox_plugin_roots()
+
     # scan for account directories under each base
     for root in plugin_roots:
         for account_dir in root.iterdir():
@@ -120,19 +101,17 @@ def choose_directories():
     root.withdraw()  # Hide the empty main window
     root.update()
 
-    config = load_config()
+    config = lotro_config.section("music")
 
     if not config.get("scan_dir"):
         autodetected = autodetect_lotro_music()
         if autodetected:
             config["scan_dir"] = autodetected
-            save_config(config)
 
     if not config.get("plugins_dir"):
         autodetected_plugins = autodetect_lotro_plugin_dirs()
         if autodetected_plugins:
             config["plugins_dir"] = autodetected_plugins[0]
-            save_config(config)
 
     last_scan = config.get("scan_dir", ".")
     last_plugins = config.get("plugins_dir", ".")
@@ -156,7 +135,7 @@ def choose_directories():
 
     config["scan_dir"] = scan_dir
     config["plugins_dir"] = plugins_dir
-    save_config(config)
+    lotro_config.flush()
 
     return scan_dir, plugins_dir
 
@@ -298,10 +277,16 @@ def render_lua(songs):
     out.append("}")
     return "\n".join(out)
 
+SONGBOOK_FILENAME = "SongbookData.plugindata"
+
+def encode_songbook(lua_text):
+    """Encode rendered Lua to the exact bytes written to disk (UTF-8, LF endings)."""
+    return lua_text.encode("utf-8")
+
 def main(scan_dir=".", output_path=None):
     start = time.time()
     scan_dir = os.path.abspath(scan_dir)
-    output_path = os.path.join(output_path, "SongbookData.plugindata")
+    output_path = os.path.join(output_path, SONGBOOK_FILENAME)
     
     print(f"[INFO] scan_dir = {scan_dir}")
     songs = build_songs(scan_dir)
@@ -310,17 +295,161 @@ def main(scan_dir=".", output_path=None):
     print(f"[INFO] Wrote {output_path}")
     # ensure output dir exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(lua_text)
+    with open(output_path, "wb") as f:
+        f.write(encode_songbook(lua_text))
+    elapsed = time.time() - start
+    print(f"[INFO] Songs written: {len(songs)}")
+    print(f"[INFO] Execution time: {elapsed:.2f} seconds")
+
+def file_digest(path):
+    """Return the sha256 hex digest of a file, or None if it can't be read."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+def place_songbook(staged, digest, size, output_dir):
+    """Install the staged SongbookData file into one account directory."""
+    output_dir = os.path.abspath(output_dir)
+    dest = os.path.join(output_dir, SONGBOOK_FILENAME)
+
+    try:
+        if (os.path.exists(dest) and os.path.getsize(dest) == size
+                and (os.path.samefile(staged, dest) or file_digest(dest) == digest)):
+            return dest, "unchanged"
+    except OSError:
+        pass
+
+    if not os.path.isdir(output_dir):
+        raise FileNotFoundError(f"Directory no longer exists: {output_dir}")
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.unlink(tmp)
+
+    # reflink keeps each copy independent, hardlink shares the inode, copy works everywhere
+    if try_reflink(staged, tmp):
+        method = "reflinked"
+    else:
+        try:
+            os.link(staged, tmp)
+            method = "hardlinked"
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+            shutil.copyfile(staged, tmp)
+            method = "copied"
+
+    os.replace(tmp, dest)
+    return dest, method
+
+def fan_out(lua_text, output_dirs, max_workers=None):
+    """Write lua_text as SongbookData to every output dir concurrently."""
+    data = encode_songbook(lua_text)
+    digest = hashlib.sha256(data).hexdigest()
+
+    # stage in the first writable target so links stay on the same filesystem where possible
+    staged = None
+    targets = []
+    for output_dir in output_dirs:
+        if staged is None:
+            candidate = os.path.join(os.path.abspath(output_dir), f".{SONGBOOK_FILENAME}.{os.getpid()}.staged")
+            try:
+                with open(candidate, "wb") as f:
+                    f.write(data)
+                staged = candidate
+            except OSError as e:
+                print(f"[WARN] Could not write SongbookData to {output_dir}: {e}")
+                continue
+        targets.append(output_dir)
+
+    if staged is None:
+        return []
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or min(8, len(targets))) as pool:
+            futures = {pool.submit(place_songbook, staged, digest, len(data), d): d for d in targets}
+            for future, output_dir in futures.items():
+                try:
+                    dest, method = future.result()
+                    print(f"[INFO] {method.capitalize()}: {dest}")
+                    results.append((dest, method))
+                except Exception as e:
+                    print(f"[WARN] Could not write SongbookData to {output_dir}: {e}")
+    finally:
+        os.unlink(staged)
+
+    return results
+
+def collect_plugin_dirs(config):
+    """Merge configured and autodetected AllServers directories, de-duplicated.
+
+    Directories that no longer exist are skipped rather than recreated.
+    """
+    dirs = []
+    configured = config.get("plugins_dirs", [])
+    if config.get("plugins_dir"):
+        configured = [config["plugins_dir"]] + list(configured)
+
+    for d in list(configured) + autodetect_lotro_plugin_dirs():
+        d = os.path.abspath(d)
+        if d in dirs:
+            continue
+        if not os.path.isdir(d):
+            print(f"[WARN] Skipping missing PluginData directory: {d}")
+            continue
+        dirs.append(d)
+    return dirs
+
+def main_all_accounts(scan_dir, output_dirs):
+    start = time.time()
+    scan_dir = os.path.abspath(scan_dir)
+
+    print(f"[INFO] scan_dir = {scan_dir}")
+    songs = build_songs(scan_dir)
+    lua_text = render_lua(songs)
+
+    results = fan_out(lua_text, output_dirs)
+    unchanged = sum(1 for _, method in results if method == "unchanged")
     elapsed = time.time() - start
     print(f"[INFO] Songs written: {len(songs)}")
+    print(f"[INFO] Accounts updated: {len(results) - unchanged}, unchanged: {unchanged}, failed: {len(output_dirs) - len(results)}")
     print(f"[INFO] Execution time: {elapsed:.2f} seconds")
 
 def run():
     print("Updating Music database...")
-    import sys
     sd, od = choose_directories()
     main(scan_dir=sd, output_path=od)
 
+def run_all_accounts():
+    print("Updating Music database for all accounts...")
+    config = lotro_config.section("music")
+
+    scan_dir = config.get("scan_dir") or autodetect_lotro_music()
+    if not scan_dir:
+        root = tk.Tk()
+        root.withdraw()
+        scan_dir = filedialog.askdirectory(title="Select LotRO Music Directory")
+        if not scan_dir:
+            print("[WARN] User cancelled directory selection.")
+            sys.exit(0)
+
+    output_dirs = collect_plugin_dirs(config)
+    if not output_dirs:
+        print("[WARN] No PluginData account directories configured or detected.")
+        return
+
+    config["scan_dir"] = scan_dir
+    lotro_config.flush()
+
+    main_all_accounts(scan_dir, output_dirs)
+
 if __name__ == "__main__":
-    run()
+    if "--all-accounts" in sys.argv[1:]:
+        run_all_accounts()
+    else:
+        run()